@@ -15,18 +15,33 @@ class File(NamedTuple):
         return f"- {self.name} (file, size={self.size})\n"
 
 
-class Directory(NamedTuple):
-    name: str
-    contents: list["BaseFile"]
-    parent: Union["Directory", None]
+class Directory:
+    """A directory whose size is kept up to date as items are added to the tree."""
+
+    __slots__ = ("name", "contents", "parent", "size")
+
+    def __init__(self, name: str, parent: Union["Directory", None] = None) -> None:
+        self.name = name
+        self.contents: list[BaseFile] = []
+        self.parent = parent
+        self.size = 0
 
-    @property
-    def size(self) -> int:
-        return sum(file.size for file in self.contents)
+    def __repr__(self) -> str:
+        return f"Directory(name={self.name!r}, size={self.size!r})"
 
     @classmethod
     def new(cls, name: str, parent: Union["Directory", None] = None) -> "Directory":
-        return cls(name=name, contents=[], parent=parent)
+        return cls(name=name, parent=parent)
+
+    def add(self, item: "BaseFile") -> None:
+        if isinstance(item, Directory):
+            # Its later additions have to reach this directory's size.
+            item.parent = self
+        self.contents.append(item)
+        directory: Directory | None = self
+        while directory is not None:
+            directory.size += item.size
+            directory = directory.parent
 
     def pprint(self) -> str:
         out = f"- {self.name} (dir)\n"
@@ -45,15 +60,15 @@ class Directory(NamedTuple):
     def lte_size(self, maxsize: int) -> Iterator[int]:
         for item in self.contents:
             if isinstance(item, Directory):
-                if item.size <= maxsize:
-                    yield item.size
+                if (size := item.size) <= maxsize:
+                    yield size
                 yield from item.lte_size(maxsize)
 
     def gte_size(self, minsize: int) -> Iterator[int]:
         for item in self.contents:
             if isinstance(item, Directory):
-                if item.size > minsize:
-                    yield item.size
+                if (size := item.size) > minsize:
+                    yield size
                 yield from item.gte_size(minsize)
 
 
@@ -84,7 +99,7 @@ def build_tree(data: Iterator[str]):
                 new_file: BaseFile = Directory.new(match[2], cwd)
             else:
                 new_file = File(match[2], size=int(match[1]))
-            cwd.contents.append(new_file)
+            cwd.add(new_file)
 
     return root
 
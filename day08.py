@@ -3,9 +3,14 @@
 # SPDX-License-Identifier: Apache-2.0
 
 
+import array
 import functools
+import heapq
+import mmap
+import operator
 from typing import NamedTuple
 from collections import UserDict
+from collections.abc import Iterator, Sequence
 
 
 class Point(NamedTuple):
@@ -91,6 +96,149 @@ class HeightMap(UserDict[Point, int]):
         print(out)
 
 
+class GridHeightMap:
+    """HeightMap backed by one bytes object per row instead of a dict of Points.
+
+    Each row is also sliced into one bitmask per height level, so visibility is
+    worked out with a few big-int operations per row rather than per tree.
+    """
+
+    def __init__(self, rows: list[bytes]) -> None:
+        if not rows or any(len(row) != len(rows[0]) for row in rows):
+            raise ValueError("Grid rows must be non-empty and of equal length")
+        self.rows = rows
+        self.x_max = len(rows[0]) - 1
+        self.y_max = len(rows) - 1
+
+    def __getitem__(self, point: Point) -> int:
+        return self.rows[point.y][point.x] - DIGITS[0]
+
+    def __iter__(self) -> Iterator[Point]:
+        return (
+            Point(x, y) for y in range(self.y_max + 1) for x in range(self.x_max + 1)
+        )
+
+    def __len__(self) -> int:
+        return (self.x_max + 1) * (self.y_max + 1)
+
+    @functools.cached_property
+    def visibility(self) -> list[int]:
+        """Bitmask of the trees visible from outside the grid, by row."""
+        vis = []
+        seen = [0] * len(DIGITS)
+        for row in self.rows:
+            masks = level_masks(row)
+            vis.append(visible_in_row(masks) | visible_past(masks, seen))
+
+        seen = [0] * len(DIGITS)
+        for y in range(self.y_max, -1, -1):
+            vis[y] |= visible_past(level_masks(self.rows[y]), seen)
+        return vis
+
+    def point_is_visible(self, point: Point) -> bool:
+        return bool((self.visibility[point.y] >> (self.x_max - point.x)) & 1)
+
+    def count_visible(self) -> int:
+        return sum(row.bit_count() for row in self.visibility)
+
+    @functools.cached_property
+    def scenic_scores(self) -> "array.array[int]":
+        """Scenic score of every tree, row by row, at y * (x_max + 1) + x."""
+        width = self.x_max + 1
+        scores = array.array("Q")
+        for row in self.rows:
+            left = viewing_distances(row)
+            right = viewing_distances(row[::-1])[::-1]
+            scores.extend(map(operator.mul, left, right))
+
+        grid = b"".join(self.rows)
+        for x in range(width):
+            column = grid[x::width]
+            up = viewing_distances(column)
+            down = viewing_distances(column[::-1])[::-1]
+            scores[x::width] = array.array(
+                "Q", map(operator.mul, scores[x::width], map(operator.mul, up, down))
+            )
+        return scores
+
+    def scenic_score(self, point: Point) -> int:
+        return self.scenic_scores[point.y * (self.x_max + 1) + point.x]
+
+    def best_scenic(self) -> tuple[int, Point]:
+        best = max(self.scenic_scores)
+        y, x = divmod(self.scenic_scores.index(best), self.x_max + 1)
+        return best, Point(x, y)
+
+    def top_scenic(self, k: int) -> list[tuple[int, Point]]:
+        scores = self.scenic_scores
+        width = self.x_max + 1
+        top = heapq.nlargest(k, range(len(scores)), key=scores.__getitem__)
+        return [(scores[i], Point(i % width, i // width)) for i in top]
+
+    def pprint(self) -> None:
+        print("\n".join(row.decode() for row in self.rows))
+
+    def pprint_vis(self) -> None:
+        width = self.x_max + 1
+        print("\n".join(f"{row:0{width}b}" for row in self.visibility))
+
+
+DIGITS = b"0123456789"
+# AT_LEAST[d] turns a row into b"1" for every tree at least d tall, else b"0".
+AT_LEAST = [
+    bytes.maketrans(DIGITS, b"0" * d + b"1" * (len(DIGITS) - d))
+    for d in range(len(DIGITS))
+]
+
+
+def viewing_distances(line: Sequence[int]) -> list[int]:
+    """How many trees each tree in line can see looking back towards the start.
+
+    The stack holds the trees that can still block a view, tallest first, so
+    every tree is pushed and popped at most once.
+    """
+    distances = []
+    stack: list[int] = []
+    for i, height in enumerate(line):
+        while stack and line[stack[-1]] < height:
+            stack.pop()
+        distances.append(i - stack[-1] if stack else i)
+        stack.append(i)
+    return distances
+
+
+def level_masks(row: bytes) -> list[int]:
+    """Bitmask of the trees at least d tall for every height d, plus an empty one.
+
+    Tree x is bit len(row) - 1 - x, so the leftmost tree is the highest bit.
+    """
+    return [int(row.translate(table), 2) for table in AT_LEAST] + [0]
+
+
+def visible_in_row(masks: list[int]) -> int:
+    # The first tree at least d tall from either end hides everything up to d
+    # behind it, so it is the only tree of height d that can be seen from there.
+    vis = 0
+    for d, at_least in enumerate(masks[:-1]):
+        if at_least:
+            leftmost = 1 << (at_least.bit_length() - 1)
+            rightmost = at_least & -at_least
+            vis |= (leftmost | rightmost) & ~masks[d + 1]
+    return vis
+
+
+def visible_past(masks: list[int], seen: list[int]) -> int:
+    """Trees taller than everything in seen, which is then updated with this row.
+
+    seen[d] marks the columns that already had a tree at least d tall.
+    """
+    vis = 0
+    for d, at_least in enumerate(masks[:-1]):
+        vis |= at_least & ~masks[d + 1] & ~seen[d]
+        seen[d] |= at_least
+    return vis
+
+
 def load_input(filename: str) -> HeightMap:
     with open(filename) as f:
         return HeightMap(
@@ -100,12 +248,61 @@ def load_input(filename: str) -> HeightMap:
         )
 
 
+def load_grid_input(filename: str) -> GridHeightMap:
+    with open(filename, "rb") as f:
+        return GridHeightMap([row for line in f if (row := line.strip())])
+
+
+def count_visible_stream(filename: str) -> int:
+    """GridHeightMap.count_visible without ever holding more than one row.
+
+    A forward pass notes which trees are visible from the top. Every height
+    can only be a new column maximum once, so there are at most ten of those
+    per column. A backward pass over the memory-mapped file then handles
+    left, right and bottom visibility and adds up the count.
+    """
+    with open(filename, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mm:
+        width = mm.find(b"\n")
+        if width == -1:
+            width = len(mm)
+        # Trailing \r is treated as part of the line ending, not the row.
+        stride = width + 1
+        if width and mm[width - 1 : width] == b"\r":
+            width -= 1
+        # Blank lines at the end of the file are not rows.
+        end = len(mm)
+        while end and mm[end - 1] in b"\r\n":
+            end -= 1
+        height = -(-end // stride)
+
+        top: dict[int, list[int]] = {}
+        seen = [0] * len(DIGITS)
+        for y in range(height):
+            row = mm[y * stride : y * stride + width]
+            if len(row) != width:
+                raise ValueError(f"Row {y} is not {width} trees wide")
+            if vis := visible_past(level_masks(row), seen):
+                top[y] = [i for i in range(vis.bit_length()) if (vis >> i) & 1]
+
+        count = 0
+        seen = [0] * len(DIGITS)
+        for y in range(height - 1, -1, -1):
+            masks = level_masks(mm[y * stride : y * stride + width])
+            vis = visible_in_row(masks) | visible_past(masks, seen)
+            for i in top.get(y, ()):
+                vis |= 1 << i
+            count += vis.bit_count()
+    return count
+
+
 def main(filename: str = "day08input.txt") -> None:
-    data = load_input(filename)
-    part1 = sum(data.point_is_visible(point) for point in data)
+    grid = load_grid_input(filename)
+    part1 = grid.count_visible()
     print("PART 1:", part1)
 
-    part2 = max(data.scenic_score(point) for point in data)
+    part2, _ = grid.best_scenic()
     print("PART 2:", part2)
 
 
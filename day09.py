@@ -2,9 +2,10 @@
 # coding: utf-8
 # SPDX-License-Identifier: Apache-2.0
 
+from array import array
 from typing import NamedTuple, Literal, cast
 from collections import UserList
-from collections.abc import Iterator
+from collections.abc import Iterable, Iterator
 
 
 class Point(NamedTuple):
@@ -27,12 +28,84 @@ class Move(NamedTuple):
         return cls(cast(Literal["U", "D", "L", "R"], direction), int(steps))
 
 
+class VisitedCells:
+    """Set of visited cells, each packed into one int in an open-addressing table.
+
+    Costs 8 bytes per slot (at most half full) instead of a Point plus a set
+    entry per cell. Coordinates must fit in a signed 32-bit int.
+    """
+
+    def __init__(self, points: Iterable[tuple[int, int]] = ()) -> None:
+        self._bits = 3
+        self._slots = array("Q", bytes(8 << self._bits))
+        self._count = 0
+        self.update(points)
+
+    @staticmethod
+    def _pack(x: int, y: int) -> int:
+        if not (-(2**31) < x < 2**31 and -(2**31) < y < 2**31):
+            raise ValueError(f"Cell out of range: {(x, y)!r}")
+        # Never 0, which marks an empty slot.
+        return ((x + 2**31) << 32) | (y + 2**31)
+
+    def _find(self, key: int) -> int:
+        """Slot holding key, or the empty slot where it belongs."""
+        slots = self._slots
+        mask = len(slots) - 1
+        # Fibonacci hashing spreads neighbouring cells across the table.
+        i = ((key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> (64 - self._bits)
+        while slots[i] and slots[i] != key:
+            i = (i + 1) & mask
+        return i
+
+    def add(self, point: tuple[int, int]) -> None:
+        key = self._pack(*point)
+        i = self._find(key)
+        if not self._slots[i]:
+            self._slots[i] = key
+            self._count += 1
+            if self._count * 2 > len(self._slots):
+                self._grow()
+
+    def update(self, points: Iterable[tuple[int, int]]) -> None:
+        for point in points:
+            self.add(point)
+
+    def _grow(self) -> None:
+        old = self._slots
+        self._bits += 1
+        self._slots = array("Q", bytes(8 << self._bits))
+        for key in old:
+            if key:
+                self._slots[self._find(key)] = key
+
+    def __contains__(self, point: object) -> bool:
+        if not isinstance(point, tuple) or len(point) != 2:
+            return False
+        try:
+            key = self._pack(*point)
+        except ValueError:
+            return False
+        return bool(self._slots[self._find(key)])
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Point]:
+        for key in self._slots:
+            if key:
+                yield Point((key >> 32) - 2**31, (key & 0xFFFFFFFF) - 2**31)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({set(self)!r})"
+
+
 class Rope:
     """Original solution to Part 1. Does not generalize well."""
 
     def __init__(self):
         self._head = Point(0, 0)
-        self.tail_history = set()
+        self.tail_history = VisitedCells()
         self.tail = Point(0, 0)
 
     @property
@@ -128,13 +201,13 @@ class Rope:
 
 class LongRope(UserList[Point]):
     def __init__(self):
-        self.tail_history: set[Point] = set()
+        self.tail_history = VisitedCells()
 
     @classmethod
     def new(cls, length: int = 10):
         rope = cls()
         rope.data = [Point(0, 0) for i in range(length)]
-        rope.tail_history = {rope.data[-1]}
+        rope.tail_history = VisitedCells([rope.data[-1]])
         return rope
 
     def __setitem__(self, i, item) -> None:
@@ -174,9 +247,11 @@ class LongRope(UserList[Point]):
 
     def propegate_move(self) -> None:
         for i in range(1, len(self)):
-            self.move_knot(i)
+            if not self.move_knot(i):
+                # Nothing behind a knot that stayed put can move either.
+                break
 
-    def move_knot(self, knot: int) -> None:
+    def move_knot(self, knot: int) -> bool:
         prev = knot - 1
         x_dist = self[prev].x - self[knot].x
         y_dist = self[prev].y - self[knot].y
@@ -185,13 +260,14 @@ class LongRope(UserList[Point]):
         y_step = 1 if y_dist > 0 else -1
         if abs(x_dist) <= 1 and abs(y_dist) <= 1:
             # touching, do nothing
-            return
+            return False
         elif x_dist == 0:
             self[knot] = self[knot].axis_move("y", y_step)
         elif y_dist == 0:
             self[knot] = self[knot].axis_move("x", x_step)
         else:
             self[knot] = self[knot].axis_move("x", x_step).axis_move("y", y_step)
+        return True
 
     def chart(
         self, x_min: int = -11, y_min: int = -5, x_max: int = 14, y_max: int = 15
@@ -226,6 +302,130 @@ class LongRope(UserList[Point]):
         print(out)
 
 
+# Unit step for the head, per move direction.
+DIRECTIONS = {"U": (0, 1), "D": (0, -1), "L": (-1, 0), "R": (1, 0)}
+
+
+class ArrayRope:
+    """LongRope with the knot coordinates in two int arrays, updated in place.
+
+    Knot i only ever follows knot i - 1, so the first n knots move exactly like
+    a rope of length n. watch lists extra knots whose history to record, which
+    answers several rope lengths with one rope.
+    """
+
+    def __init__(self, length: int = 10, watch: Iterable[int] = ()) -> None:
+        self.xs = array("i", [0]) * length
+        self.ys = array("i", [0]) * length
+        self.watched = sorted({length - 1, *watch})
+        self.histories = {
+            knot: VisitedCells([Point(0, 0)]) for knot in self.watched
+        }
+        self.tail_history = self.histories[length - 1]
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def __getitem__(self, i: int) -> Point:
+        return Point(self.xs[i], self.ys[i])
+
+    def __iter__(self) -> Iterator[Point]:
+        return map(Point, self.xs, self.ys)
+
+    def __repr__(self):
+        return (
+            f"{type(self).__name__}(data={list(self)!r}, "
+            f"tail_history={self.tail_history!r})"
+        )
+
+    def move_head(self, move: Move) -> None:
+        dx, dy = DIRECTIONS[move.direction]
+        self.move(dx, dy, move.steps)
+
+    def move(self, dx: int, dy: int, steps: int) -> None:
+        xs, ys = self.xs, self.ys
+        knots = range(1, len(xs))
+        for step in range(steps):
+            prev_x = xs[0] = xs[0] + dx
+            prev_y = ys[0] = ys[0] + dy
+            moved = len(xs)
+            straight = True
+            for knot in knots:
+                x = xs[knot]
+                y = ys[knot]
+                x_dist = prev_x - x
+                y_dist = prev_y - y
+                if -1 <= x_dist <= 1 and -1 <= y_dist <= 1:
+                    # touching, and nothing behind this knot can move either
+                    moved = knot
+                    break
+                # Step one square towards the previous knot on each axis.
+                x = xs[knot] = x + (x_dist > 0) - (x_dist < 0)
+                y = ys[knot] = y + (y_dist > 0) - (y_dist < 0)
+                straight = straight and prev_x - x == dx and prev_y - y == dy
+                prev_x, prev_y = x, y
+
+            for knot in self.watched:
+                if knot >= moved:
+                    break
+                self.histories[knot].add(Point(xs[knot], ys[knot]))
+
+            if straight and moved == len(xs):
+                # Every knot trails the one in front by exactly one step in
+                # the direction of the move, so the whole rope just slides
+                # for the rest of it.
+                self.slide(dx, dy, steps - step - 1)
+                return
+
+    def slide(self, dx: int, dy: int, steps: int) -> None:
+        xs, ys = self.xs, self.ys
+        for knot in self.watched:
+            x, y = xs[knot], ys[knot]
+            self.histories[knot].update(
+                Point(x + dx * i, y + dy * i) for i in range(1, steps + 1)
+            )
+        for knot in range(len(xs)):
+            xs[knot] += dx * steps
+            ys[knot] += dy * steps
+
+
+class MoveLog(NamedTuple):
+    """A whole move log, parsed once: one byte per direction, steps in an array."""
+
+    directions: bytes
+    steps: array
+
+    @classmethod
+    def from_file(cls, filename: str) -> "MoveLog":
+        directions = bytearray()
+        steps = array("I")
+        for move in load_input(filename):
+            directions += move.direction.encode()
+            steps.append(move.steps)
+        return cls(bytes(directions), steps)
+
+    def deltas(self) -> Iterator[tuple[int, int, int]]:
+        """(dx, dy, steps) for each move."""
+        for direction, steps in zip(self.directions, self.steps):
+            yield (*DIRECTIONS[chr(direction)], steps)
+
+
+def tail_counts(log: MoveLog, lengths: Iterable[int]) -> list[int]:
+    """Cells visited by the tail of a rope of each length, in one pass over log."""
+    lengths = list(lengths)
+    rope = ArrayRope(max(lengths), watch=[length - 1 for length in lengths])
+    for dx, dy, steps in log.deltas():
+        rope.move(dx, dy, steps)
+    return [len(rope.histories[length - 1]) for length in lengths]
+
+
+def batch_tail_counts(
+    logs: Iterable[MoveLog], lengths: Iterable[int]
+) -> list[list[int]]:
+    lengths = list(lengths)
+    return [tail_counts(log, lengths) for log in logs]
+
+
 def load_input(filename: str) -> Iterator[Move]:
     with open(filename) as f:
         for line in f:
@@ -254,7 +454,7 @@ def part1alt(filename: str = "day09input.txt") -> None:
 
 def part2(filename: str = "day09input.txt") -> None:
     moves = load_input(filename)
-    rope = LongRope.new(length=10)
+    rope = ArrayRope(length=10)
     for move in moves:
         rope.move_head(move)
 
@@ -3,7 +3,59 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import dataclasses
-from collections.abc import Iterator
+from array import array
+from collections.abc import Callable, Iterable, Iterator
+from itertools import accumulate
+from typing import NamedTuple
+
+NOOP = 0
+ADDX = 1
+LIT = ord("#")
+DARK = ord(" ")
+
+
+@dataclasses.dataclass
+class FrameBuffer:
+    """A CRT screen, overwritten pixel by pixel as the beam sweeps across it.
+
+    on_frame is called with a copy of each frame as its last pixel is drawn.
+    """
+
+    width: int = 40
+    height: int = 6
+    on_frame: Callable[[bytes], None] | None = None
+    pixels: bytearray = dataclasses.field(init=False)
+    position: int = dataclasses.field(default=0, init=False)
+
+    def __post_init__(self) -> None:
+        self.pixels = bytearray([DARK]) * (self.width * self.height)
+
+    def draw(self, x: int) -> bytes | None:
+        """Draw the next pixel with the sprite at x, returning a finished frame."""
+        cur_pixel = self.position % self.width
+        self.pixels[self.position] = LIT if -1 <= cur_pixel - x <= 1 else DARK
+        self.position += 1
+        if self.position < len(self.pixels):
+            return None
+
+        self.position = 0
+        frame = bytes(self.pixels)
+        if self.on_frame is not None:
+            self.on_frame(frame)
+        return frame
+
+    def flush(self) -> bytes | None:
+        """The partly drawn frame, if the beam stopped mid-frame."""
+        if self.position == 0:
+            return None
+        frame = bytes(self.pixels[: self.position])
+        self.position = 0
+        return frame
+
+    def render(self, frame: bytes | None = None) -> str:
+        if frame is None:
+            frame = bytes(self.pixels)
+        return render_frame(frame, self.width)
 
 
 @dataclasses.dataclass
@@ -11,20 +63,22 @@ class CPU:
     x: int = 1
     counter: int = 0
     strengths: list[int] = dataclasses.field(default_factory=list)
-    output: str = ""
+    screen: FrameBuffer = dataclasses.field(default_factory=FrameBuffer)
+
+    @property
+    def output(self) -> str:
+        return self.screen.render()
 
     def execute(self, instruction: str) -> None:
-        self.cycle()
+        opcodes, operands = decode([instruction])
+        self.run(Program(opcodes, operands))
 
-        # Execute new instruction
-        match instruction.split():
-            case ["noop"]:
-                return
-            case ["addx", val]:
+    def run(self, program: "Program") -> None:
+        for opcode, operand in zip(program.opcodes, program.operands):
+            self.cycle()
+            if opcode == ADDX:
                 self.cycle()
-                self.x += int(val)
-            case _:
-                raise ValueError(instruction)
+                self.x += operand
 
     def cycle(self) -> None:
         self.counter += 1
@@ -38,15 +92,81 @@ class CPU:
         self.strengths.append(self.x * self.counter)
 
     def draw_pixel(self) -> None:
-        visible_pixels = [self.x - 1, self.x, self.x + 1]
-        cur_pixel = (self.counter - 1) % 40
-        if cur_pixel in visible_pixels:
-            self.output += "\u2588"
-        else:
-            self.output += " "
+        self.screen.draw(self.x)
+
+
+class Program(NamedTuple):
+    """A decoded program: one opcode byte and one operand per instruction."""
+
+    opcodes: bytes
+    operands: array
+
+
+def decode(instructions: Iterable[str]) -> Program:
+    opcodes = bytearray()
+    operands = array("i")
+    for instruction in instructions:
+        match instruction.split():
+            case ["noop"]:
+                opcodes.append(NOOP)
+                operands.append(0)
+            case ["addx", val]:
+                opcodes.append(ADDX)
+                operands.append(int(val))
+            case _:
+                raise ValueError(instruction)
+    return Program(bytes(opcodes), operands)
+
+
+def x_trace(program: Program) -> array:
+    """The X register during each cycle; cycle n is at index n - 1."""
+    deltas = array("i")
+    for opcode, operand in zip(program.opcodes, program.operands):
+        if opcode == ADDX:
+            deltas.append(0)
+        deltas.append(operand)
+    # X only changes at the end of a cycle, so the final value is not needed.
+    trace = array("i", accumulate(deltas, initial=1))
+    trace.pop()
+    return trace
+
+
+def signal_strengths(
+    trace: array, cycles: Iterable[int] | None = None
+) -> list[int]:
+    if cycles is None:
+        cycles = range(20, len(trace) + 1, 40)
+    return [cycle * trace[cycle - 1] for cycle in cycles]
+
+
+def render_frame(frame: bytes, width: int = 40) -> str:
+    """A frame as text; only completed rows end in a newline."""
+    text = frame.decode().replace("#", "\u2588")
+    rows = (text[i : i + width] for i in range(0, len(text), width))
+    return "".join(row + "\n" if len(row) == width else row for row in rows)
+
+
+def frames(
+    trace: Iterable[int], width: int = 40, height: int = 6, flush: bool = False
+) -> Iterator[bytes]:
+    """Completed frames for an X trace, one screen's worth of memory at a time.
+
+    With flush, a frame left partly drawn at the end is yielded last.
+    """
+    screen = FrameBuffer(width, height)
+    for x in trace:
+        frame = screen.draw(x)
+        if frame is not None:
+            yield frame
+    if flush and (frame := screen.flush()) is not None:
+        yield frame
+
 
-        if cur_pixel == 39:
-            self.output += "\n"
+def render(trace: Iterable[int], width: int = 40, height: int = 6) -> str:
+    return "".join(
+        render_frame(frame, width)
+        for frame in frames(trace, width, height, flush=True)
+    )
 
 
 def load_input(filename: str) -> Iterator[str]:
@@ -56,13 +176,13 @@ def load_input(filename: str) -> Iterator[str]:
 
 
 def main(filename: str = "day10input.txt"):
-    cpu = CPU()
-    for line in load_input(filename):
-        cpu.execute(line)
+    trace = x_trace(decode(load_input(filename)))
 
-    print("PART 1:", sum(cpu.strengths))
+    print("PART 1:", sum(signal_strengths(trace)))
     print("PART 2:")
-    print(cpu.output)
+    for frame in frames(trace, flush=True):
+        print(render_frame(frame), end="")
+    print()
 
 
 if __name__ == "__main__":
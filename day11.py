@@ -4,13 +4,16 @@
 
 from __future__ import annotations
 
+import concurrent.futures
 import dataclasses
+import os
 import re
 import collections
 import math
 import operator
 import functools
-from collections.abc import Callable
+import itertools
+from collections.abc import Callable, Iterable
 
 WorryLevel = int
 MonkeyId = int
@@ -34,7 +37,9 @@ class Monkey:
             item = self.items.popleft()
             item = self.operation(item)
             if not worried:
-                item = math.floor(item / 3)
+                # Integer division: item / 3 goes through a float and loses
+                # precision once worry levels pass 2**53.
+                item = item // 3
             if lcm is not None:
                 # We only need to test for divisibility.
                 # Anything divisible by the lcm has more data than we need
@@ -49,14 +54,160 @@ class Monkey:
             monkeys[target].items.append(item)
             self.count += 1
 
+    def turn_batch(
+        self, monkeys: list[Monkey], worried: bool = False, lcm: int | None = None
+    ) -> None:
+        """Same as turn(), but each step runs over all held items at once.
+
+        Every step is a map()/compress() over the whole batch, so the loop
+        over items happens in C instead of once per item in Python.
+        """
+        # Items thrown back to this monkey are inspected again this turn,
+        # just like turn() does, so keep going until none are left.
+        while self.items:
+            held, self.items = self.items, collections.deque()
+            items: Iterable[WorryLevel] = map(self.operation, held)
+            if not worried:
+                items = map(operator.floordiv, items, itertools.repeat(3))
+            if lcm is not None:
+                items = map(operator.mod, items, itertools.repeat(lcm))
+            new = list(items)
+            remainders = list(map(operator.mod, new, itertools.repeat(self.test)))
+
+            monkeys[self.test_true].items.extend(
+                itertools.compress(new, map(operator.not_, remainders))
+            )
+            monkeys[self.test_false].items.extend(itertools.compress(new, remainders))
+            self.count += len(new)
+
+
+def item_round(
+    monkeys: list[Monkey],
+    monkey: MonkeyId,
+    item: WorryLevel,
+    lcm: int | None,
+    worried: bool = True,
+) -> tuple[MonkeyId, WorryLevel, list[MonkeyId]]:
+    """Follow one item through a single round on its own.
+
+    Returns where the item is when the round ends and who inspected it.
+    """
+    inspected = []
+    while True:
+        current = monkeys[monkey]
+        inspected.append(monkey)
+        item = current.operation(item)
+        if not worried:
+            item = item // 3
+        if lcm is not None:
+            item = item % lcm
+        if (item % current.test) == 0:
+            target = current.test_true
+        else:
+            target = current.test_false
+        # Monkeys later in the round (or this one, mid-turn) see it again.
+        if target < monkey:
+            return target, item, inspected
+        monkey = target
+
+
+def fast_forward(monkeys: list[Monkey], rounds: int, lcm: int) -> None:
+    """Play rounds of part 2 at once, however many there are.
+
+    Items never affect each other, and (monkey, item % lcm) at the start of a
+    round fully decides the rest of an item's path. So each item's path
+    repeats after at most len(monkeys) * lcm rounds. It is followed until
+    the first repeat, and the remaining whole cycles are counted with
+    arithmetic.
+    """
+    starts = collections.Counter(
+        (i, item % lcm) for i, monkey in enumerate(monkeys) for item in monkey.items
+    )
+    for monkey in monkeys:
+        monkey.items.clear()
+
+    for state, copies in starts.items():
+        seen: dict[tuple[MonkeyId, WorryLevel], int] = {}
+        history: list[list[MonkeyId]] = []
+        while len(history) < rounds and state not in seen:
+            seen[state] = len(history)
+            monkey_id, item, inspected = item_round(monkeys, *state, lcm)
+            history.append(inspected)
+            state = (monkey_id, item)
+
+        counts = collections.Counter(itertools.chain.from_iterable(history))
+        if len(history) < rounds:
+            cycle_start = seen[state]
+            cycles, rest = divmod(rounds - cycle_start, len(history) - cycle_start)
+            extra = history[cycle_start : cycle_start + rest]
+            counts.update(itertools.chain.from_iterable(extra))
+            cycle = itertools.chain.from_iterable(history[cycle_start:])
+            for monkey_id, count in collections.Counter(cycle).items():
+                counts[monkey_id] += count * (cycles - 1)
+            state = list(seen)[cycle_start + rest]
+
+        for monkey_id, count in counts.items():
+            monkeys[monkey_id].count += count * copies
+        monkeys[state[0]].items.extend(itertools.repeat(state[1], copies))
+
+
+def simulate_items(
+    monkeys: list[Monkey],
+    items: list[tuple[MonkeyId, WorryLevel]],
+    rounds: int,
+    worried: bool,
+    lcm: int | None,
+) -> list[int]:
+    """Inspection counts per monkey for a shard of (monkey, item) pairs."""
+    counts = [0] * len(monkeys)
+    for monkey_id, item in items:
+        for i in range(rounds):
+            monkey_id, item, inspected = item_round(
+                monkeys, monkey_id, item, lcm, worried
+            )
+            for target in inspected:
+                counts[target] += 1
+    return counts
+
+
+def parallel_counts(
+    monkeys: list[Monkey],
+    rounds: int,
+    worried: bool = True,
+    lcm: int | None = None,
+    workers: int | None = None,
+) -> list[int]:
+    """Inspection counts per monkey, with the items shared out between processes.
+
+    Items never affect each other, so every worker can follow its own items
+    through all the rounds and the counts simply add up.
+    """
+    items = [(i, item) for i, monkey in enumerate(monkeys) for item in monkey.items]
+    workers = workers or os.cpu_count() or 1
+    shards = [items[i::workers] for i in range(workers)]
+    # Workers only need the rules, not everyone else's items.
+    rules = [
+        dataclasses.replace(monkey, items=collections.deque()) for monkey in monkeys
+    ]
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        results = pool.map(
+            simulate_items,
+            itertools.repeat(rules),
+            shards,
+            itertools.repeat(rounds),
+            itertools.repeat(worried),
+            itertools.repeat(lcm),
+        )
+        return [sum(counts) for counts in zip(*results)]
+
 
 def load_input(filename: str) -> list[Monkey]:
-    regex = r"""Monkey (\d):
+    regex = r"""Monkey (\d+):
   Starting items: ([\d ,]+)
   Operation: new = old (.*?)
   Test: divisible by (\d+)
-    If true: throw to monkey (\d)
-    If false: throw to monkey (\d)"""
+    If true: throw to monkey (\d+)
+    If false: throw to monkey (\d+)"""
     monkeys = []
     with open(filename) as f:
         for raw_monkey in f.read().split("\n\n"):
@@ -99,16 +250,14 @@ def part1(filename="day11input.txt") -> None:
     print("PART 1:", monkey_business)
 
 
-def part2(filename="day11input.txt") -> None:
+def part2(filename="day11input.txt", rounds: int = 10000) -> None:
     monkeys = load_input(filename)
     lcm = math.lcm(*[monkey.test for monkey in monkeys])
-    for i in range(10000):
-        for monkey in monkeys:
-            monkey.turn(monkeys, worried=True, lcm=lcm)
+    fast_forward(monkeys, rounds, lcm)
 
     top_two = sorted(monkey.count for monkey in monkeys)[-2:]
     monkey_business = top_two[0] * top_two[1]
-    print("PART 1:", monkey_business)
+    print("PART 2:", monkey_business)
 
 
 def main():
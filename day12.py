@@ -3,10 +3,30 @@
 # SPDX-License-Identifier: Apache-2.0
 
 from __future__ import annotations
+import abc
 import string
 import math
 import collections
-from typing import NamedTuple
+import functools
+import heapq
+import itertools
+import array
+from typing import Generic, NamedTuple, TypeVar
+from collections.abc import (
+    Callable,
+    Container,
+    Hashable,
+    Iterable,
+    Iterator,
+    MutableMapping,
+)
+
+Node = TypeVar("Node", bound=Hashable)
+
+# Raw input byte -> height, for the compact backend.
+HEIGHTS = bytes.maketrans(
+    b"SE" + string.ascii_lowercase.encode(), bytes([0, 25, *range(26)])
+)
 
 
 class Point(NamedTuple):
@@ -17,12 +37,130 @@ class Point(NamedTuple):
         return math.isqrt((self.x - other.x) ** 2 + (self.y - other.y) ** 2)
 
 
-class HeightMap(collections.UserDict[Point, int]):
+class SearchResult(NamedTuple):
+    distance: float
+    expanded: int
+
+
+class Searchable(abc.ABC, Generic[Node]):
+    """Search engine shared by the heightmap backends.
+
+    Subclasses provide start/end, adjacent() (reverse edges), climbable()
+    (forward edges) and heuristic(), and call _init_cache() on creation.
+    """
+
+    start: Node | None
+    end: Node | None
+
+    def _init_cache(self, cache_size: int) -> None:
+        # LRU of full distance fields, keyed by (target, max_step).
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._fields: collections.OrderedDict[
+            tuple[Node, int], MutableMapping[Node, int]
+        ] = collections.OrderedDict()
+
+    @abc.abstractmethod
+    def adjacent(self, node: Node, max_step: int = 1) -> list[Node]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def climbable(self, node: Node, max_step: int = 1) -> list[Node]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def heuristic(self, target: Node) -> Callable[[Node], int]:
+        raise NotImplementedError
+
+    def new_distances(self) -> MutableMapping[Node, int]:
+        return {}
+
+    def dijkstra(self, starts: set[Node] = set()) -> float:
+        if self.start is None or self.end is None:
+            raise ValueError
+        if not starts:
+            starts = {self.start}
+
+        # For part 2, easiest to solve backwards.
+        return bfs(self.end, self.adjacent, starts, self.new_distances).distance
+
+    def search(
+        self,
+        start: Node | None = None,
+        end: Node | None = None,
+        max_step: int = 1,
+        method: str = "bfs",
+    ) -> SearchResult:
+        start = self.start if start is None else start
+        end = self.end if end is None else end
+        if start is None or end is None:
+            raise ValueError
+
+        # Searches run backwards from end, like dijkstra().
+        adjacent = functools.partial(self.adjacent, max_step=max_step)
+        match method:
+            case "bfs":
+                return bfs(end, adjacent, {start}, self.new_distances)
+            case "astar":
+                return astar(
+                    end, start, adjacent, self.heuristic(start), self.new_distances
+                )
+            case "bidirectional":
+                climbable = functools.partial(self.climbable, max_step=max_step)
+                return bidirectional_bfs(
+                    end, start, adjacent, climbable, self.new_distances
+                )
+            case _:
+                raise ValueError(method)
+
+    def distance_field(
+        self, target: Node | None = None, max_step: int = 1
+    ) -> MutableMapping[Node, int]:
+        """Distance from every point that can reach target, computed once."""
+        if target is None:
+            if self.end is None:
+                raise ValueError
+            target = self.end
+
+        key = (target, max_step)
+        if key in self._fields:
+            self.cache_hits += 1
+            self._fields.move_to_end(key)
+            return self._fields[key]
+
+        self.cache_misses += 1
+        field = distances(
+            target,
+            functools.partial(self.adjacent, max_step=max_step),
+            self.new_distances,
+        )
+        self._fields[key] = field
+        if len(self._fields) > self.cache_size:
+            self._fields.popitem(last=False)
+        return field
+
+    def distance(
+        self,
+        starts: Iterable[Node],
+        target: Node | None = None,
+        max_step: int = 1,
+    ) -> float:
+        field = self.distance_field(target, max_step)
+        return min((field.get(start, math.inf) for start in starts), default=math.inf)
+
+
+class HeightMap(Searchable[Point], collections.UserDict[Point, int]):
     def __init__(
-        self, *args, start: Point | None = None, end: Point | None = None
+        self,
+        *args,
+        start: Point | None = None,
+        end: Point | None = None,
+        cache_size: int = 8,
     ) -> None:
         self.start = start
         self.end = end
+        self._init_cache(cache_size)
 
         super().__init__(*args)
 
@@ -32,6 +170,16 @@ class HeightMap(collections.UserDict[Point, int]):
             f"end={self.end!r}, data={self.data!r})"
         )
 
+    def __setitem__(self, key: Point, item: int) -> None:
+        if self._fields:
+            self._fields.clear()
+        super().__setitem__(key, item)
+
+    def __delitem__(self, key: Point) -> None:
+        if self._fields:
+            self._fields.clear()
+        super().__delitem__(key)
+
     def adjacent(self, point: Point, max_step: int = 1) -> list[Point]:
         return [
             new_point
@@ -44,31 +192,240 @@ class HeightMap(collections.UserDict[Point, int]):
             if new_point in self and self[new_point] >= self[point] - max_step
         ]
 
-    def dijkstra(self, starts: set[Point] = set()) -> float:
-        if self.start is None or self.end is None:
-            raise ValueError
-        if not starts:
-            starts = {self.start}
+    def climbable(self, point: Point, max_step: int = 1) -> list[Point]:
+        """Forward counterpart of adjacent(): points reachable from point."""
+        return [
+            new_point
+            for new_point in (
+                point._replace(x=point.x - 1),
+                point._replace(x=point.x + 1),
+                point._replace(y=point.y - 1),
+                point._replace(y=point.y + 1),
+            )
+            if new_point in self and self[new_point] <= self[point] + max_step
+        ]
 
-        # For part 2, easiest to solve backwards.
-        unvisited = set(self.keys())
-        t_dist = dict.fromkeys(unvisited, math.inf)
-        t_dist[self.end] = 0
-        cur = self.end
-        while unvisited:
-            cur_dist = t_dist[cur]
-            for neighbor in self.adjacent(cur):
-                n_dist = cur_dist + 1
-                if t_dist[neighbor] > n_dist:
-                    t_dist[neighbor] = n_dist
+    def heuristic(self, target: Point) -> Callable[[Point], int]:
+        return target.dist
+
+
+class DistanceArray(MutableMapping[int, int]):
+    """Distances for CompactHeightMap, 4 bytes per cell. -1 means unvisited."""
+
+    def __init__(self, size: int) -> None:
+        self.data = array.array("i", [-1]) * size
+
+    def __contains__(self, key: object) -> bool:
+        return self.data[key] >= 0  # type: ignore
+
+    def __getitem__(self, key: int) -> int:
+        if (val := self.data[key]) < 0:
+            raise KeyError(key)
+        return val
+
+    def __setitem__(self, key: int, val: int) -> None:
+        self.data[key] = val
+
+    def __delitem__(self, key: int) -> None:
+        if self.data[key] < 0:
+            raise KeyError(key)
+        self.data[key] = -1
+
+    def __iter__(self) -> Iterator[int]:
+        return (key for key, val in enumerate(self.data) if val >= 0)
+
+    def __len__(self) -> int:
+        return sum(val >= 0 for val in self.data)
+
+
+class CompactHeightMap(Searchable[int]):
+    """Heights in one flat buffer, one byte per cell, indexed by y * width + x.
+
+    Nodes are plain int indices, so the search engine never builds a Point.
+    """
+
+    def __init__(
+        self,
+        heights: bytearray,
+        width: int,
+        start: int | None = None,
+        end: int | None = None,
+        cache_size: int = 2,
+    ) -> None:
+        self.heights = heights
+        self.width = width
+        self.start = start
+        self.end = end
+        self._init_cache(cache_size)
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__qualname__}(width={self.width!r}, "
+            f"start={self.start!r}, end={self.end!r}, size={len(self.heights)!r})"
+        )
 
-            unvisited.remove(cur)
-            if starts.isdisjoint(unvisited):
-                return min(t_dist[start] for start in starts)
+    def index(self, point: Point) -> int:
+        return point.y * self.width + point.x
 
-            cur = sorted(unvisited, key=lambda p: t_dist[p])[0]
+    def point(self, index: int) -> Point:
+        y, x = divmod(index, self.width)
+        return Point(x, y)
 
-        raise ValueError("No path found")
+    def around(self, index: int) -> list[int]:
+        width = self.width
+        x = index % width
+        out = []
+        if x:
+            out.append(index - 1)
+        if x != width - 1:
+            out.append(index + 1)
+        if index >= width:
+            out.append(index - width)
+        if index + width < len(self.heights):
+            out.append(index + width)
+        return out
+
+    def adjacent(self, index: int, max_step: int = 1) -> list[int]:
+        heights = self.heights
+        floor = heights[index] - max_step
+        return [i for i in self.around(index) if heights[i] >= floor]
+
+    def climbable(self, index: int, max_step: int = 1) -> list[int]:
+        heights = self.heights
+        ceiling = heights[index] + max_step
+        return [i for i in self.around(index) if heights[i] <= ceiling]
+
+    def heuristic(self, target: int) -> Callable[[int], int]:
+        target_point = self.point(target)
+        return lambda index: self.point(index).dist(target_point)
+
+    def new_distances(self) -> DistanceArray:
+        return DistanceArray(len(self.heights))
+
+
+DistanceFactory = Callable[[], MutableMapping[Node, int]]
+
+
+def bfs(
+    source: Node,
+    neighbors: Callable[[Node], Iterable[Node]],
+    targets: Container[Node],
+    new_dist: DistanceFactory = dict,
+) -> SearchResult:
+    # Every step costs 1, so a FIFO frontier visits nodes in distance order
+    # and the first target reached is the closest one.
+    dist = new_dist()
+    dist[source] = 0
+    frontier = collections.deque([source])
+    expanded = 0
+    while frontier:
+        cur = frontier.popleft()
+        if cur in targets:
+            return SearchResult(dist[cur], expanded)
+        expanded += 1
+        n_dist = dist[cur] + 1
+        for neighbor in neighbors(cur):
+            if neighbor not in dist:
+                dist[neighbor] = n_dist
+                frontier.append(neighbor)
+
+    return SearchResult(math.inf, expanded)
+
+
+def astar(
+    source: Node,
+    target: Node,
+    neighbors: Callable[[Node], Iterable[Node]],
+    heuristic: Callable[[Node], int],
+    new_dist: DistanceFactory = dict,
+) -> SearchResult:
+    """heuristic must never overestimate the remaining distance to target.
+
+    Point.dist rounds the straight-line distance down, so it is admissible
+    (and consistent) on a grid where every step costs 1.
+    """
+    dist = new_dist()
+    dist[source] = 0
+    # The counter breaks ties without comparing nodes.
+    tiebreak = itertools.count()
+    queue = [(heuristic(source), next(tiebreak), source)]
+    closed: set[Node] = set()
+    while queue:
+        _, _, cur = heapq.heappop(queue)
+        if cur == target:
+            return SearchResult(dist[cur], len(closed))
+        if cur in closed:
+            continue
+        closed.add(cur)
+        n_dist = dist[cur] + 1
+        for neighbor in neighbors(cur):
+            if n_dist < dist.get(neighbor, math.inf):
+                dist[neighbor] = n_dist
+                heapq.heappush(
+                    queue, (n_dist + heuristic(neighbor), next(tiebreak), neighbor)
+                )
+
+    return SearchResult(math.inf, len(closed))
+
+
+def bidirectional_bfs(
+    source: Node,
+    target: Node,
+    neighbors: Callable[[Node], Iterable[Node]],
+    reverse_neighbors: Callable[[Node], Iterable[Node]],
+    new_dist: DistanceFactory = dict,
+) -> SearchResult:
+    if source == target:
+        return SearchResult(0, 0)
+
+    # Grow whichever side has the smaller frontier by one full level at a time.
+    # The best meeting found during a level is then the shortest path.
+    source_dist, target_dist = new_dist(), new_dist()
+    source_dist[source] = 0
+    target_dist[target] = 0
+    sides = [
+        (source_dist, [source], neighbors),
+        (target_dist, [target], reverse_neighbors),
+    ]
+    expanded = 0
+    while sides[0][1] and sides[1][1]:
+        if len(sides[1][1]) < len(sides[0][1]):
+            sides.reverse()
+        (dist, frontier, step), (other_dist, _, _) = sides
+        best = math.inf
+        next_frontier = []
+        for cur in frontier:
+            expanded += 1
+            n_dist = dist[cur] + 1
+            for neighbor in step(cur):
+                if neighbor in other_dist:
+                    best = min(best, n_dist + other_dist[neighbor])
+                if neighbor not in dist:
+                    dist[neighbor] = n_dist
+                    next_frontier.append(neighbor)
+        if best < math.inf:
+            return SearchResult(best, expanded)
+        sides[0] = (dist, next_frontier, step)
+
+    return SearchResult(math.inf, expanded)
+
+
+def distances(
+    source: Node,
+    neighbors: Callable[[Node], Iterable[Node]],
+    new_dist: DistanceFactory = dict,
+) -> MutableMapping[Node, int]:
+    dist = new_dist()
+    dist[source] = 0
+    frontier = collections.deque([source])
+    while frontier:
+        cur = frontier.popleft()
+        n_dist = dist[cur] + 1
+        for neighbor in neighbors(cur):
+            if neighbor not in dist:
+                dist[neighbor] = n_dist
+                frontier.append(neighbor)
+    return dist
 
 
 def load_input(filename: str) -> HeightMap:
@@ -90,13 +447,37 @@ def load_input(filename: str) -> HeightMap:
     return heightmap
 
 
+def load_compact_input(filename: str) -> CompactHeightMap:
+    heights = bytearray()
+    start = end = None
+    width = 0
+    with open(filename, "rb") as f:
+        for line in f:
+            row = line.rstrip(b"\r\n")
+            if not row:
+                continue
+            if not width:
+                width = len(row)
+            elif len(row) != width:
+                raise ValueError(line)
+            if (x := row.find(b"S")) != -1:
+                start = len(heights) + x
+            if (x := row.find(b"E")) != -1:
+                end = len(heights) + x
+            heights += row.translate(HEIGHTS)
+    return CompactHeightMap(heights, width, start=start, end=end)
+
+
 def main(filename: str = "day12input.txt") -> None:
     heightmap = load_input(filename)
-    part1 = heightmap.dijkstra()
+    if heightmap.start is None:
+        raise ValueError
+    # Both parts share the same end, so the distance field is only built once.
+    part1 = heightmap.distance({heightmap.start})
     print("PART 1:", part1)
 
-    part2 = heightmap.dijkstra(
-        {point for point, height in heightmap.items() if height == 0}
+    part2 = heightmap.distance(
+        point for point, height in heightmap.items() if height == 0
     )
     print("PART 2:", part2)
 
@@ -3,9 +3,12 @@
 # SPDX-License-Identifier: Apache-2.0
 
 from __future__ import annotations
+import bisect
+import functools
 import itertools
-from typing import NamedTuple, Union
-from collections.abc import Iterator
+import re
+from typing import NamedTuple, Union, cast
+from collections.abc import Iterable, Iterator
 
 PacketList = list[Union["PacketList", int]]
 
@@ -61,34 +64,261 @@ def compare(left: PacketList, right: PacketList) -> bool | None:
     return None
 
 
+class Node:
+    """Interned, immutable packet list with its hash worked out once."""
+
+    __slots__ = ("items", "_hash")
+
+    def __init__(self, items: tuple[Node | int, ...]) -> None:
+        self.items = items
+        # Children are interned Nodes with their own cached hash, so this
+        # only looks at one level.
+        self._hash = hash(items)
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other: object) -> bool:
+        return self is other or (
+            isinstance(other, Node)
+            and self._hash == other._hash
+            and self.items == other.items
+        )
+
+    def __repr__(self) -> str:
+        return f"{type(self).__qualname__}({list(self.items)!r})"
+
+
+class PacketInterner:
+    """Shares identical sublists between packets and remembers comparisons.
+
+    Every structurally identical (sub)list becomes the same Node, so repeated
+    subtrees are compared once, and the results are kept in an LRU cache keyed
+    on pairs of nodes.
+    """
+
+    def __init__(self, cache_size: int | None = 2**16) -> None:
+        self.nodes: dict[Node, Node] = {}
+        self.singletons: dict[int, Node] = {}
+        self.compare = functools.lru_cache(maxsize=cache_size)(self._compare)
+
+    def intern(self, packet: PacketList) -> Node:
+        node = Node(
+            tuple(
+                item if isinstance(item, int) else self.intern(item)
+                for item in packet
+            )
+        )
+        return self.nodes.setdefault(node, node)
+
+    def promote(self, value: int) -> Node:
+        if value not in self.singletons:
+            self.singletons[value] = self.intern([value])
+        return self.singletons[value]
+
+    def _compare(self, left: Node, right: Node) -> bool | None:
+        """compare() for interned nodes."""
+        if left is right:
+            return None
+        for lval, rval in zip(left.items, right.items):
+            if isinstance(lval, int) and isinstance(rval, int):
+                if lval == rval:
+                    continue
+                return lval < rval
+            if isinstance(lval, int):
+                lval = self.promote(lval)
+            elif isinstance(rval, int):
+                rval = self.promote(rval)
+            res = self.compare(lval, rval)
+            if res is not None:
+                return res
+        if len(left.items) == len(right.items):
+            return None
+        return len(left.items) < len(right.items)
+
+
+# Sort key tokens. CLOSE sorts before everything, since the shorter list comes
+# first; OPEN only ever meets CLOSE or another OPEN once ints are padded.
+OPEN = -1
+CLOSE = -2
+
+
+def list_depth(packet: PacketList) -> int:
+    """How many lists deep the packet goes, counting itself."""
+    return 1 + max(
+        (list_depth(item) for item in packet if isinstance(item, list)), default=0
+    )
+
+
+def sort_key(packet: PacketList, depth: int) -> tuple[int, ...]:
+    """Flat key that orders packets the same way compare() does.
+
+    Comparing x with a list behaves exactly like comparing [x] with it, so
+    every int can be wrapped until it sits depth lists deep without changing
+    any comparison. Once depth is at least list_depth() of every packet being
+    compared, ints and lists never line up against each other, and comparing
+    the token tuples is the same as compare().
+    """
+    tokens = []
+
+    def walk(value: PacketList, level: int) -> None:
+        tokens.append(OPEN)
+        for item in value:
+            if isinstance(item, int):
+                tokens.extend(itertools.repeat(OPEN, depth - level))
+                tokens.append(item)
+                tokens.extend(itertools.repeat(CLOSE, depth - level))
+            else:
+                walk(item, level + 1)
+        tokens.append(CLOSE)
+
+    walk(packet, 1)
+    return tuple(tokens)
+
+
+def divider_ranks(
+    packets: Iterable[PacketList], dividers: list[PacketList]
+) -> list[int]:
+    """Where each divider is found (from 1) once sorted in with packets.
+
+    Only counts how many packets come before each divider, so the packets can
+    be streamed straight from the file and are never sorted or kept. This
+    matches list.index on a stable sort with the dividers added last, like
+    load_full_input: ties sort in input order, and a packet that is an exact
+    copy of a divider is found in its place.
+    """
+    less = [0] * len(dividers)
+    ties = [0] * len(dividers)
+    # Ties ahead of the first exact copy, which at the latest is the divider.
+    ties_before = [0] * len(dividers)
+    found = [False] * len(dividers)
+    for packet in itertools.chain(packets, dividers):
+        for i, divider in enumerate(dividers):
+            res = compare(packet, divider)
+            if res:
+                less[i] += 1
+            elif res is None:
+                if not found[i] and packet == divider:
+                    found[i] = True
+                    ties_before[i] = ties[i]
+                ties[i] += 1
+    return [n + tied + 1 for n, tied in zip(less, ties_before)]
+
+
+class PacketStore:
+    """Packets kept sorted as they arrive, for rank queries by bisection."""
+
+    def __init__(self, packets: Iterable[PacketList] = ()) -> None:
+        self.depth = 1
+        self.packets: list[PacketList] = []
+        self.keys: list[tuple[int, ...]] = []
+        for packet in packets:
+            self.insert(packet)
+
+    def __len__(self) -> int:
+        return len(self.packets)
+
+    def __iter__(self) -> Iterator[PacketList]:
+        return iter(self.packets)
+
+    def key(self, packet: PacketList) -> tuple[int, ...]:
+        if (depth := list_depth(packet)) > self.depth:
+            # The order never depends on depth, only the keys do.
+            self.depth = depth
+            self.keys = [sort_key(stored, depth) for stored in self.packets]
+        return sort_key(packet, self.depth)
+
+    def insert(self, packet: PacketList) -> int:
+        key = self.key(packet)
+        i = bisect.bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.packets.insert(i, packet)
+        return i
+
+    def rank(self, packet: PacketList) -> int:
+        """How many stored packets sort strictly before packet."""
+        return bisect.bisect_left(self.keys, self.key(packet))
+
+
+TOKEN = re.compile(r"\d+|\S")
+
+
+def parse_packet(line: str) -> Packet:
+    """Parse one packet: nested lists of non-negative ints, nothing else."""
+    root: Packet | None = None
+    stack: list[PacketList] = []
+    # What the previous token allows next.
+    want_value = True
+    for token in TOKEN.findall(line):
+        if root is not None and not stack:
+            raise ValueError(f"Trailing data in packet: {line!r}")
+        if token == "[":
+            if not want_value:
+                raise ValueError(f"Unexpected '[' in packet: {line!r}")
+            new: PacketList = [] if stack else Packet()
+            if stack:
+                stack[-1].append(new)
+            else:
+                root = cast(Packet, new)
+            stack.append(new)
+        elif token == "]":
+            if not stack or (want_value and stack[-1]):
+                raise ValueError(f"Unexpected ']' in packet: {line!r}")
+            stack.pop()
+        elif token == ",":
+            if want_value or not stack:
+                raise ValueError(f"Unexpected ',' in packet: {line!r}")
+            want_value = True
+            continue
+        elif token.isdigit() and stack and want_value:
+            stack[-1].append(int(token))
+        else:
+            raise ValueError(f"Unexpected {token!r} in packet: {line!r}")
+        want_value = token == "["
+    if root is None or stack:
+        raise ValueError(f"Incomplete packet: {line!r}")
+    return root
+
+
+def load_packets(filename: str) -> Iterator[Packet]:
+    with open(filename) as f:
+        for line in f:
+            if line.strip():
+                yield parse_packet(line)
+
+
 def load_paired_input(filename: str) -> Iterator[Pair]:
+    """Pairs of packets, each pair separated from the next by blank lines."""
     with open(filename) as f:
-        for raw_pair in f.read().split("\n\n"):
-            raw_left, raw_right = raw_pair.strip().split("\n")
-            yield Pair(Packet(eval(raw_left)), Packet(eval(raw_right)))  # Hush.
+        group: list[Packet] = []
+        for line in itertools.chain(f, [""]):
+            if line.strip():
+                group.append(parse_packet(line))
+            elif group:
+                if len(group) != 2:
+                    raise ValueError(f"Expected a pair of packets, got {group}")
+                yield Pair(*group)
+                group = []
 
 
 def load_full_input(filename: str) -> Iterator[Packet]:
-    with open(filename) as f:
-        for line in f:
-            if line == "\n":
-                continue
-            yield Packet(eval(line.strip()))  # 🦢👌 Shut.
+    yield from load_packets(filename)
 
     yield Packet([[2]])
     yield Packet([[6]])
 
 
 def main(filename: str = "day13input.txt") -> None:
+    interner = PacketInterner()
     part1 = sum(
         i + 1
         for i, pair in enumerate(load_paired_input(filename))
-        if pair.correct_order()
+        if interner.compare(interner.intern(pair.left), interner.intern(pair.right))
     )
     print("PART 1:", part1)
 
-    ordered = sorted(load_full_input(filename))
-    part2 = (ordered.index(Packet([[2]])) + 1) * (ordered.index(Packet([[6]])) + 1)
+    first, second = divider_ranks(load_packets(filename), [[[2]], [[6]]])
+    part2 = first * second
     print("PART 2:", part2)
 
 
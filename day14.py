@@ -4,9 +4,10 @@
 
 from __future__ import annotations
 import enum
-import functools
-from typing import NamedTuple
-from collections import UserDict
+import sys
+from typing import NamedTuple, TypeVar
+from collections import Counter, UserDict
+from collections.abc import Iterator
 
 
 class Point(NamedTuple):
@@ -28,55 +29,129 @@ class Tile(enum.Enum):
     SAND_SOURCE = enum.auto()
 
 
+ScanT = TypeVar("ScanT", bound="Scan")
+
+
 class Scan(UserDict[Point, Tile]):
+    """Tiles by position, with rock kept in row bitmasks instead of self.data.
+
+    The mapping view (in, len, iteration) still lists rock. Only the FloorScan
+    floor is left out, since it never ends.
+    """
+
     def __init__(self, *args, **kwargs):
+        # Kept up to date by __setitem__/__delitem__, so nothing has to scan
+        # the whole map to find the source or count the sand.
+        self.source: Point | None = None
+        self.counts: Counter[Tile] = Counter()
+        # Extent of every tile ever placed, including rock.
+        self.x_min = self.y_min = sys.maxsize
+        self.x_max = self.y_max = -sys.maxsize
+        # Rock is kept out of self.data: one bitmask of x per row, indexed by y,
+        # with bit i being x = rock_x0 + i.
+        self.rock_rows: list[int] = []
+        self.rock_x0 = 0
         super().__init__(*args, **kwargs)
-        if Tile.SAND_SOURCE not in self.values():
+        if self.source is None:
             self[Point(500, 0)] = Tile.SAND_SOURCE
 
     def __missing__(self, key: Point) -> Tile:
+        if self.is_rock(key):
+            return Tile.ROCK
         return Tile.AIR
 
-    @functools.cached_property
-    def x_max(self) -> int:
-        return max(point.x for point in self.data)
-
-    @functools.cached_property
-    def x_min(self) -> int:
-        return min(point.x for point in self.data)
-
-    @functools.cached_property
-    def y_max(self) -> int:
-        return max(point.y for point in self.data)
-
-    @functools.cached_property
-    def y_min(self) -> int:
-        return min(point.y for point in self.data)
+    def __setitem__(self, key: Point, item: Tile) -> None:
+        if item is Tile.ROCK:
+            if key in self.data:
+                del self[key]
+            self.add_rock(key, key)
+            return
+        if key in self.data or self.is_rock(key):
+            del self[key]
+        self.data[key] = item
+        self.counts[item] += 1
+        if item is Tile.SAND_SOURCE:
+            self.source = key
+        self.extend_bounds(key, key)
+
+    def __delitem__(self, key: Point) -> None:
+        if key not in self.data and self.is_rock(key):
+            self.rock_rows[key.y] &= ~(1 << (key.x - self.rock_x0))
+            self.counts[Tile.ROCK] -= 1
+            return
+        item = self.data.pop(key)
+        self.counts[item] -= 1
+        if key == self.source:
+            self.source = None
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.data or (isinstance(key, Point) and self.is_rock(key))
+
+    def __len__(self) -> int:
+        return len(self.data) + self.counts[Tile.ROCK]
+
+    def __iter__(self) -> Iterator[Point]:
+        yield from self.data
+        for y, row in enumerate(self.rock_rows):
+            while row:
+                low = row & -row
+                yield Point(self.rock_x0 + low.bit_length() - 1, y)
+                row ^= low
+
+    def is_rock(self, key: Point) -> bool:
+        """Whether key is rock in the row bitmasks (not in self.data)."""
+        bit = key.x - self.rock_x0
+        if 0 <= key.y < len(self.rock_rows) and bit >= 0:
+            return bool((self.rock_rows[key.y] >> bit) & 1)
+        return False
+
+    def extend_bounds(self, low: Point, high: Point) -> None:
+        if low.x < self.x_min:
+            self.x_min = low.x
+        if high.x > self.x_max:
+            self.x_max = high.x
+        if low.y < self.y_min:
+            self.y_min = low.y
+        if high.y > self.y_max:
+            self.y_max = high.y
 
     def load_rock(self, line: str) -> None:
+        """Add a rock path; x may be negative, but y must not be."""
         raw_points = iter(line.split(" -> "))
         from_point = Point.from_str(next(raw_points))
         for raw_point in raw_points:
             to_point = Point.from_str(raw_point)
-
-            if from_point.x == to_point.x:
-                axis = "y"
-            elif from_point.y == to_point.y:
-                axis = "x"
-            else:
+            if from_point.x != to_point.x and from_point.y != to_point.y:
                 raise ValueError(from_point, to_point)
 
-            if (start := getattr(from_point, axis)) < (end := getattr(to_point, axis)):
-                r = range(start, end + 1)
-            else:
-                r = range(end, start + 1)
-
-            for n in r:
-                point = from_point._replace(**{axis: n})
-                self[point] = Tile.ROCK
+            low = Point(min(from_point.x, to_point.x), min(from_point.y, to_point.y))
+            high = Point(max(from_point.x, to_point.x), max(from_point.y, to_point.y))
+            self.add_rock(low, high)
 
             from_point = to_point
 
+    def add_rock(self, low: Point, high: Point) -> None:
+        """Fill the rectangle from low to high with rock; y must not be negative."""
+        if low.y < 0:
+            raise ValueError(low, high)
+        if high.y >= len(self.rock_rows):
+            self.rock_rows.extend([0] * (high.y + 1 - len(self.rock_rows)))
+        if low.x < self.rock_x0:
+            shift = self.rock_x0 - low.x
+            self.rock_rows = [row << shift for row in self.rock_rows]
+            self.rock_x0 = low.x
+
+        # The whole x span is set at once on every row it covers.
+        span = ((1 << (high.x - low.x + 1)) - 1) << (low.x - self.rock_x0)
+        rock_rows = self.rock_rows
+        added = 0
+        for y in range(low.y, high.y + 1):
+            old = rock_rows[y]
+            rock_rows[y] = old | span
+            added += (span & ~old).bit_count()
+        self.counts[Tile.ROCK] += added
+        self.extend_bounds(low, high)
+
     def pprint(self) -> None:
         out = ""
         for y in range(self.y_min, self.y_max + 1):
@@ -96,7 +171,9 @@ class Scan(UserDict[Point, Tile]):
         print(out)
 
     def add_sand(self, void: bool) -> bool:
-        pos = next(point for point, tile in self.items() if tile is Tile.SAND_SOURCE)
+        if self.source is None:
+            raise ValueError("No sand source")
+        pos = self.source
         while True:
             if void and (pos.y > self.y_max):
                 return False
@@ -116,12 +193,40 @@ class Scan(UserDict[Point, Tile]):
                     self[pos] = Tile.SAND
                     return True
 
-    def simulate(self, void: bool) -> None:
-        while self.add_sand(void=void):
-            pass
+    def simulate(self, void: bool, method: str = "grain") -> None:
+        match method:
+            case "grain":
+                while self.add_sand(void=void):
+                    pass
+            case "path":
+                self.simulate_path(void=void)
+            case _:
+                raise ValueError(method)
+
+    def simulate_path(self, void: bool) -> None:
+        # Each grain follows the previous one until the cell where that one
+        # came to rest, so resume from there instead of from the source.
+        if self.source is None:
+            raise ValueError("No sand source")
+        path = [self.source]
+        while path:
+            pos = path[-1]
+            if void and (pos.y > self.y_max):
+                return
+            for possible_pos in [
+                pos._replace(y=pos.y + 1),
+                pos._replace(y=pos.y + 1, x=pos.x - 1),
+                pos._replace(y=pos.y + 1, x=pos.x + 1),
+            ]:
+                if self[possible_pos] is Tile.AIR:
+                    path.append(possible_pos)
+                    break
+            else:
+                self[pos] = Tile.SAND
+                path.pop()
 
     @classmethod
-    def load_input(cls, filename: str) -> Scan:
+    def load_input(cls: type[ScanT], filename: str) -> ScanT:
         scan = cls()
         with open(filename) as f:
             for line in f:
@@ -130,26 +235,75 @@ class Scan(UserDict[Point, Tile]):
 
 
 class FloorScan(Scan):
+    @property
+    def floor(self) -> int:
+        # Sand piling up must not move the floor, so only rock counts here.
+        return max(len(self.rock_rows) - 1, 0) + 2
+
     def __missing__(self, key: Point) -> Tile:
-        if key.y == self.y_max + 2:
+        if key.y == self.floor:
             return Tile.ROCK
         return super().__missing__(key)
 
+    def simulate(self, void: bool, method: str = "grain") -> None:
+        if method != "rows":
+            return super().simulate(void=void, method=method)
+        if void:
+            raise ValueError("The rows solver needs the floor")
+        for y, x0, row in self.sand_rows():
+            while row:
+                low = row & -row
+                self[Point(x0 + low.bit_length() - 1, y)] = Tile.SAND
+                row ^= low
+
+    def sand_rows(self) -> Iterator[tuple[int, int, int]]:
+        """Yield (y, x0, bitmask) for each row of settled sand, bit i being x0 + i.
+
+        A cell fills exactly when it is not rock and sand can fall into it from
+        one of the three cells above, so each row follows from the one above
+        it without simulating any grains.
+        """
+        if self.source is None:
+            raise ValueError("No sand source")
+        rock_rows = self.rock_rows
+        # Sand spreads one column per row, so it can end up left of the rock.
+        x0 = min(self.rock_x0, self.source.x - (self.floor - self.source.y))
+        rock_shift = self.rock_x0 - x0
+        row = 1 << (self.source.x - x0)
+        for y in range(self.source.y, self.floor):
+            yield y, x0, row
+            row |= (row << 1) | (row >> 1)
+            if y + 1 < len(rock_rows):
+                row &= ~(rock_rows[y + 1] << rock_shift)
+
+    def count_sand(self) -> int:
+        return sum(row.bit_count() for _, _, row in self.sand_rows())
+
 
 def part1(filename: str = "day14input.txt") -> None:
     scan = Scan.load_input(filename)
-    scan.simulate(void=True)
-    part1 = sum(True for val in scan.values() if val is Tile.SAND)
+    scan.simulate(void=True, method="path")
+    part1 = scan.counts[Tile.SAND]
     print("PART 1:", part1)
 
 
 def part2(filename: str = "day14input.txt") -> None:
     scan = FloorScan.load_input(filename)
-    scan.simulate(void=False)
-    part2 = sum(True for val in scan.values() if val is Tile.SAND)
+    part2 = scan.count_sand()
     print("PART 2:", part2)
 
 
+def check_part2(filename: str = "day14input.txt") -> None:
+    expected = FloorScan.load_input(filename)
+    expected.simulate(void=False, method="path")
+    actual = FloorScan.load_input(filename)
+    count = actual.count_sand()
+    actual.simulate(void=False, method="rows")
+    if actual.data != expected.data or count != expected.counts[Tile.SAND]:
+        raise AssertionError("Row solver disagrees with the grain simulation")
+    print("PART 2: row solver matches")
+
+
 def main(filename: str = "day14input.txt") -> None:
     part1(filename)
     part2(filename)